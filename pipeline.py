@@ -1,33 +1,70 @@
-import matplotlib
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
 import pystac_client
-import rioxarray
-import geopandas as gpd
-from shapely.geometry import box
+from pystac_client.stac_api_io import StacApiIO
+from requests.adapters import HTTPAdapter
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.windows import from_bounds
+from pyproj import Transformer
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
-def calculate_marine_status(red, green):
+# Every band is read into this fixed grid. Band means don't need native resolution,
+# and decimated reads let GDAL pull from the COG overviews instead of full-res tiles.
+OUT_SHAPE = (256, 256)
+
+# Scene Classification (SCL) classes kept for the stats:
+# 4 vegetation, 5 not vegetated, 6 water, 7 unclassified, 11 snow/ice.
+# Everything else (cloud, shadow, saturated, nodata) is masked out.
+SCL_VALID = [4, 5, 6, 7, 11]
+
+STAC_URL = "https://earth-search.aws.element84.com/v1"
+
+def band_stats(red, green, scl=None):
+    """
+    Reduces the clipped bands using one NDTI buffer and one shared valid mask,
+    with green reduced only once.
+    Returns the mean NDTI, the mean green reflectance and the valid pixel count.
+    If an SCL band on the same grid is given, cloudy/shadowed pixels are dropped.
+    """
+    # Flat contiguous float32 views (no copy when the bands are already float32):
+    # NDTI is built in one scratch buffer and both means share one valid-pixel mask.
+    r = np.ascontiguousarray(red, dtype=np.float32).ravel()
+    g = np.ascontiguousarray(green, dtype=np.float32).ravel()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndti = np.subtract(r, g)
+        np.divide(ndti, r + g, out=ndti)
+    valid = np.isfinite(ndti)
+    if scl is not None:
+        valid &= np.isin(np.asarray(scl).ravel(), SCL_VALID)
+    count = np.count_nonzero(valid)
+    if count == 0:
+        # Raise rather than return NaN means, so a bad result never reaches the caches
+        raise ValueError("No cloud-free pixels in bbox")
+    ndti_mean = float(np.add.reduce(ndti, where=valid) / count)
+    green_mean = float(np.add.reduce(g, where=valid) / count)
+    return ndti_mean, green_mean, count
+
+def calculate_marine_status(ndti_mean, green_mean):
     """
     ASSET 2: Biodiversity & Water Quality.
     Returns NDTI for turbidity and a proxy for seagrass presence.
     """
-    ndti = (red - green) / (red + green)
-    avg_turbidity = float(ndti.mean())
+    avg_turbidity = ndti_mean
     
     # Proxy for Biodiversity Net Gain (BNG): 
     # In shallow water, higher NIR/Green reflectance can indicate benthic vegetation.
-    veg_proxy = float(green.mean() / 10000) * 1.15 
-    return ndti, avg_turbidity, veg_proxy
+    veg_proxy = float(green_mean / 10000) * 1.15 
+    return avg_turbidity, veg_proxy
 
-def calculate_turbine_feasibility(red, green):
+def calculate_turbine_feasibility(green_mean):
     """
     ASSET 1: Infrastructure & Engineering.
     Calculates depth proxies and technical viability.
     """
     # Depth Proxy: Irish Sea banks show higher green reflectance in shallower zones.
     # We normalize this to a realistic meter range (10m - 40m).
-    depth_m = float(30 - (green.mean() / 500)) 
+    depth_m = float(30 - (green_mean / 500)) 
     if depth_m < 5: depth_m = 12.0 # Grounding logic
     
     avg_wind_speed = 9.4  # m/s (Irish Sea Baseline)
@@ -37,37 +74,114 @@ def calculate_turbine_feasibility(red, green):
     score = (avg_wind_speed * 5) + (40 - depth_m)
     return round(score, 1), round(depth_m, 1), avg_wind_speed, dist_shore
 
-def run_analysis(bbox_coords, site_name="Target_Site"):
-    # 1. SEARCH & FETCH
-    client = pystac_client.Client.open("https://earth-search.aws.element84.com/v1")
-    search = client.search(
+@lru_cache(maxsize=8)
+def _to_crs(crs):
+    return Transformer.from_crs("EPSG:4326", crs, always_xy=True)
+
+def load_band(href, bbox_coords, resampling=Resampling.average):
+    """
+    Reads the bbox window of one COG band, decimated to OUT_SHAPE.
+    Returned as a float32 array with NaN for nodata: plenty for band ratios,
+    and half the bytes of float64.
+    """
+    with rasterio.open(href) as src:
+        bounds = _to_crs(src.crs.to_string()).transform_bounds(*bbox_coords)
+        window = from_bounds(*bounds, transform=src.transform)
+        band = src.read(1, window=window, out_shape=OUT_SHAPE, resampling=resampling, masked=True)
+    return band.astype(np.float32).filled(np.nan)
+
+@lru_cache(maxsize=1)
+def _get_stac_client():
+    # One client per process: its keep-alive session skips the TCP/TLS setup on every search
+    stac_io = StacApiIO()
+    # Keep the retry policy StacApiIO set on its own adapter; mounting a new one would drop it
+    retries = stac_io.session.get_adapter("https://").max_retries
+    stac_io.session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retries))
+    return pystac_client.Client.open(STAC_URL, stac_io=stac_io)
+
+def search_item(bbox_coords):
+    """
+    Finds a Sentinel-2 scene over the bbox with under 10% cloud cover
+    (the first one the API lists, not necessarily the clearest).
+    Returns the red/green/SCL COG hrefs and the item id.
+    """
+    search = _get_stac_client().search(
         collections=["sentinel-2-l2a"], 
         bbox=bbox_coords, 
         max_items=1, 
         query={"eo:cloud_cover": {"lt": 10}}
     )
     item = list(search.items())[0]
+    return item.assets["red"].href, item.assets["green"].href, item.assets["scl"].href, item.id
+
+def load_bands(red_href, green_href, scl_href, bbox_coords):
+    """
+    Fetches the red, green and SCL bands, clipped to the bbox.
+    All three cover the same window at OUT_SHAPE, so they line up pixel for pixel.
+    """
+    # All three are remote COGs, so fetch them in parallel rather than one after the other
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        red_job = pool.submit(load_band, red_href, bbox_coords)
+        green_job = pool.submit(load_band, green_href, bbox_coords)
+        # SCL holds class codes, so it must not be averaged
+        scl_job = pool.submit(load_band, scl_href, bbox_coords, Resampling.nearest)
+        return red_job.result(), green_job.result(), scl_job.result()
+
+def compute_metrics(red, green, scl=None):
+    """
+    Runs both calculators on the clipped bands, masked by SCL if given.
+    Returns score, clarity, bng_val, depth, wind, dist.
+    """
+    ndti_mean, green_mean, _ = band_stats(red, green, scl)
+    clarity, bng_val = calculate_marine_status(ndti_mean, green_mean)
+    score, depth, wind, dist = calculate_turbine_feasibility(green_mean)
+    return score, clarity, bng_val, depth, wind, dist
+
+def run_analysis(bbox_coords, site_name="Target_Site", make_plot=False):
+    # 1. SEARCH & FETCH
+    red_href, green_href, scl_href, _ = search_item(bbox_coords)
 
     # 2. OPEN & CLIP
-    red_raw = rioxarray.open_rasterio(item.assets["red"].href, masked=True).squeeze()
-    green_raw = rioxarray.open_rasterio(item.assets["green"].href, masked=True).squeeze()
-    
-    geom = [box(*bbox_coords)]
-    gdf = gpd.GeoDataFrame({"geometry": geom}, crs="EPSG:4326").to_crs(red_raw.rio.crs)
-    red = red_raw.rio.clip(gdf.geometry, gdf.crs)
-    green = green_raw.rio.clip(gdf.geometry, gdf.crs)
+    red, green, scl = load_bands(red_href, green_href, scl_href, bbox_coords)
 
     # 3. RUN CALCS
-    ndti, clarity, bng_val = calculate_marine_status(red, green)
-    score, depth, wind, dist = calculate_turbine_feasibility(red, green)
+    score, clarity, bng_val, depth, wind, dist = compute_metrics(red, green, scl)
     
-    # 4. PLOT (For local verification, even if UI uses st.map)
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ndti.plot(ax=ax, cmap="YlGnBu")
-    ax.set_title(f"NDTI Analysis: {site_name}")
-    report_path = f"{site_name}_report.png"
-    plt.savefig(report_path)
-    plt.close(fig)
+    # 4. PLOT (Only for local verification; the UI never displays it)
+    report_path = None
+    if make_plot:
+        import matplotlib
+        matplotlib.use('Agg') 
+        import matplotlib.pyplot as plt
+
+        ndti = (red - green) / (red + green)
+        fig, ax = plt.subplots(figsize=(10, 6))
+        fig.colorbar(ax.imshow(ndti, cmap="YlGnBu"), ax=ax)
+        ax.set_title(f"NDTI Analysis: {site_name}")
+        report_path = f"{site_name}_report.png"
+        plt.savefig(report_path)
+        plt.close(fig)
 
     # Return all 7 values needed by your app.py boxes
-    return report_path, score, clarity, bng_val, depth, wind, dist
\ No newline at end of file
+    return report_path, score, clarity, bng_val, depth, wind, dist
+
+def run_analysis_batch(bboxes, site_names=None, analyse=run_analysis):
+    """
+    Runs several sites concurrently and returns their results in input order.
+    The work is mostly blocking HTTP reads, which release the GIL, so threads overlap well.
+    `analyse` lets callers swap in a cached wrapper around run_analysis.
+    A site that fails comes back as its exception, so one bad site doesn't sink the rest.
+    """
+    if not bboxes:
+        return []
+    if site_names is None:
+        site_names = ["Target_Site"] * len(bboxes)
+    with ThreadPoolExecutor(max_workers=min(8, len(bboxes))) as pool:
+        jobs = [pool.submit(analyse, bbox, name) for bbox, name in zip(bboxes, site_names)]
+    results = []
+    for job in jobs:
+        try:
+            results.append(job.result())
+        except Exception as e:
+            results.append(e)
+    return results
\ No newline at end of file
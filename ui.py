@@ -0,0 +1,166 @@
+"""
+Shared UI pieces for the Streamlit pages: site list, cached pipeline stages
+and the map/results renderers. Entrypoints just wire these together.
+"""
+import streamlit as st
+import pandas as pd
+import pydeck as pdk
+import datetime
+from pipeline import search_item, load_bands, compute_metrics
+
+# Site Options
+site_options = {
+    "Kish Bank": {"lat": 53.27, "lon": -5.95, "bbox": [-6.05, 53.15, -5.85, 53.38]},
+    "Arklow Bank": {"lat": 52.85, "lon": -6.00, "bbox": [-6.10, 52.75, -5.90, 52.95]}
+}
+
+# Share links: the app URL never changes, so these are built once
+APP_URL = "https://eo-marine.streamlit.app"
+WA_PREFIX = "https://api.whatsapp.com/send?text= "
+LI_PREFIX = "https://www.linkedin.com/sharing/share-offsite/?url="
+EMAIL_PREFIX = "mailto:?subject=EO for Marine and Renewable Energy &body= "
+WA_LINK = WA_PREFIX + APP_URL
+LI_LINK = LI_PREFIX + APP_URL
+EMAIL_LINK = EMAIL_PREFIX + APP_URL
+
+# One-row map frames, built once at import rather than on every rerun
+MAP_DFS = {
+    name: pd.DataFrame([{'lat': cfg['lat'], 'lon': cfg['lon'], 'coords': f"{cfg['lat']}, {cfg['lon']}"}])
+    for name, cfg in site_options.items()
+}
+
+# CACHING: makes app instant on reload
+# Each pipeline stage gets its own bounded cache, so a change to the calcs
+# doesn't throw away the STAC search or the downloaded bands.
+@st.cache_data(show_spinner=False, ttl="1h", max_entries=32)
+def _search_item(bbox):
+    return search_item(list(bbox))
+
+@st.cache_data(show_spinner=False, ttl="1h", max_entries=32)
+def _load_bands(red_href, green_href, scl_href, bbox):
+    return load_bands(red_href, green_href, scl_href, list(bbox))
+
+@st.cache_data(show_spinner=False, ttl="1h", max_entries=32)
+def _compute_metrics(red_href, green_href, scl_href, bbox):
+    # Keyed on the hrefs rather than the arrays, so nothing large gets hashed
+    red, green, scl = _load_bands(red_href, green_href, scl_href, bbox)
+    return compute_metrics(red, green, scl)
+
+# Persisted to disk so results survive container restarts; the tuple is all
+# plain scalars, so it pickles cleanly. Streamlit ignores ttl on persisted caches,
+# so the ISO week is part of the key instead: entries expire at the ISO week
+# boundary (Monday), however recently they were computed. Without it a hit here
+# would mask the 1h TTLs above forever. Old weeks' entries are never hit again,
+# but stay on disk until the cache is cleared.
+@st.cache_data(show_spinner=False, persist="disk", max_entries=64)
+def _cached_analysis(bbox, site_name, week):
+    red_href, green_href, scl_href, _ = _search_item(bbox)
+    score, clarity, bng_val, depth, wind, dist = _compute_metrics(red_href, green_href, scl_href, bbox)
+    # The UI never shows the NDTI plot, so no report is rendered here
+    return None, score, clarity, bng_val, depth, wind, dist
+
+def cached_analysis(bbox, site_name):
+    # This wrapper function saves the result.
+    # bbox arrives as a rounded tuple (see bbox_key) so it hashes cheaply and consistently.
+    year, week, _ = datetime.date.today().isocalendar()
+    return _cached_analysis(bbox, site_name, f"{year}-W{week:02d}")
+
+# Deck objects are built once per site and shared across reruns and sessions.
+# cache_resource hands back the same object, so it must never be mutated.
+@st.cache_resource
+def build_deck(site):
+    target_lat = site_options[site]['lat']
+    target_lon = site_options[site]['lon']
+    map_df = MAP_DFS[site]
+
+    return pdk.Deck(
+        map_style=None,
+        initial_view_state=pdk.ViewState(latitude=target_lat, longitude=target_lon, zoom=10, pitch=0),
+        layers=[
+            pdk.Layer("ScatterplotLayer", data=map_df, get_position=["lon", "lat"], get_color=[0, 255, 128, 200], get_radius=800),
+            pdk.Layer("TextLayer", data=map_df, get_position=["lon", "lat"], get_text="coords", get_size=18, get_color=[255, 255, 255], get_alignment_baseline="'bottom'", get_pixel_offset=[0, -20])
+        ],
+        height=350 
+    )
+
+def render_map(site):
+    st.pydeck_chart(build_deck(site))
+
+def history_entry(site, result):
+    """
+    Row for the Site Comparison table.
+    """
+    report_path, score, clarity, bng_val, depth, wind, dist = result
+    bng_pct = f"{int(bng_val * 100)}%"
+    est_credits = bng_val * 50 * 2.5
+    return {"Site": site, "Feasibility": f"{score}/100", "Turbidity": f"{clarity:.2f}", "Bio-Gain": bng_pct, "Credits (t/yr)": f"{est_credits:.1f}"}
+
+def render_results(result):
+    report_path, score, clarity, bng_val, depth, wind, dist = result
+    bng_pct = f"{int(bng_val * 100)}%"
+    est_credits = bng_val * 50 * 2.5
+
+    # --- 1. COMPLIANCE ---
+    st.header("⚖️ 1. Compliance")
+    c1, c2 = st.columns(2)
+    
+    with c1:
+        st.subheader("Maritime Area Consent ✅")
+        # Combined Line: Turbidity (NDTI) : -0.29
+        st.markdown(f"<h4 style='margin-bottom:0;'>Turbidity (NDTI) : {clarity:.3f}</h4>", unsafe_allow_html=True)
+        st.success(f"NDTI < 0: Water not polluted.  \n\nSun penetrates water to grow seagrass.")
+    
+    with c2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.subheader("EU Habitats Directive ✅")
+        # Reduced gap below header implicitly by removing spacer
+        st.success("No adverse effect.  \n\nSeagrass protect erosion on wind turbine base.")
+
+    st.divider()
+
+    # --- 2. SUSTAINABLE FINANCE ---
+    st.header("💰 2. Sustainable Finance")
+    s1, s2 = st.columns(2)
+    
+    with s1:
+        st.subheader(f"Biodiversity Gain: {bng_pct}") # Header
+        st.write("High seabed vegetation") # Smaller, non-bold
+        st.progress(int(bng_val * 100) if bng_val <= 1.0 else 100)
+        st.success("Eligible for Sustainable Loans")
+        
+    with s2:
+        st.subheader("ESG Value") # Header
+        st.write("High Carbon Capture") # Smaller, non-bold
+        st.success(f"Carbon Credits generated:  \n**{est_credits:.1f} tonnes / year**")
+
+    st.divider()
+
+    # --- 3. OFFSHORE FEASIBILITY ---
+    st.header("🏗️ 3. Offshore Feasibility")
+    
+    e1, e2, e3 = st.columns(3)
+    e1.metric("Wind Speed", f"{wind} m/s")
+    e2.metric("Seabed Depth", f"{depth} m")
+    e3.metric("Distance to Shore", f"{dist} km")
+
+    st.warning(f"**Feasibility: {score}/100**") 
+
+@st.fragment
+def render_share():
+    st.divider()
+    st.subheader("🔗 Share")
+
+    # Create columns for the 1-click buttons
+    sh1, sh2, sh3, sh4 = st.columns(4)
+
+    with sh1:
+        # WhatsApp (api.whatsapp.com)
+        st.link_button("💬 WhatsApp", WA_LINK, use_container_width=True)
+
+    with sh2:
+        # LinkedIn (linkedin.com/sharing/share-offsite)
+        st.link_button("🟦 LinkedIn", LI_LINK, use_container_width=True)
+
+    with sh3:
+        # Email (mailto:)
+        st.link_button("✉️ Email", EMAIL_LINK, use_container_width=True)